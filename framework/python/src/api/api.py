@@ -15,9 +15,11 @@
 from fastapi import (FastAPI, APIRouter, Response, Request, status, UploadFile)
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 from datetime import datetime
 import json
 from json import JSONDecodeError
+import math
 import os
 import psutil
 import requests
@@ -38,6 +40,12 @@ DEVICE_TEST_MODULES_KEY = "test_modules"
 DEVICES_PATH = "local/devices"
 DEFAULT_DEVICE_INTF = "enx123456789123"
 
+# How often the status wait endpoint checks the session status (seconds)
+STATUS_WAIT_INTERVAL = 0.1
+
+# Longest a status wait request is held open for (seconds)
+STATUS_WAIT_MAX_TIMEOUT = 900
+
 LATEST_RELEASE_CHECK = ("https://api.github.com/repos/google/" +
                         "testrun/releases/latest")
 
@@ -65,6 +73,9 @@ class Api:
                                self.stop_test_run,
                                methods=["POST"])
     self._router.add_api_route("/system/status", self.get_status)
+    self._router.add_api_route("/system/status/wait",
+                               self.wait_for_status,
+                               methods=["POST"])
     self._router.add_api_route("/system/shutdown",
                                self.shutdown,
                                methods=["POST"])
@@ -269,6 +280,42 @@ class Api:
   async def get_status(self):
     return self._test_run.get_session().to_json()
 
+  async def wait_for_status(self, request: Request, response: Response):
+
+    LOGGER.debug("Received status wait request")
+
+    try:
+      body_json = json.loads((await request.body()).decode("UTF-8"))
+    except JSONDecodeError:
+      response.status_code = status.HTTP_400_BAD_REQUEST
+      return self._generate_msg(False, "Invalid JSON received")
+
+    target = body_json.get("target") if isinstance(body_json, dict) else None
+    timeout = body_json.get("timeout") if isinstance(body_json, dict) else None
+
+    if (not isinstance(target, str)
+        or isinstance(timeout, bool)
+        or not isinstance(timeout, (int, float))
+        or not math.isfinite(timeout)
+        or timeout < 0):
+      response.status_code = status.HTTP_400_BAD_REQUEST
+      return self._generate_msg(False, "Invalid request received")
+
+    # Hold the request open until the status matches or the timeout expires
+    target = target.lower()
+    timeout = min(timeout, STATUS_WAIT_MAX_TIMEOUT)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while self._test_run.get_session().get_status().lower() != target:
+      remaining = deadline - loop.time()
+      if remaining <= 0:
+        response.status_code = status.HTTP_504_GATEWAY_TIMEOUT
+        return self._generate_msg(
+            False, "Timed out waiting for the requested status")
+      await asyncio.sleep(min(STATUS_WAIT_INTERVAL, remaining))
+
+    return self._test_run.get_session().to_json()
+
   def shutdown(self, response: Response):
 
     LOGGER.debug("Received request to shutdown Testrun")
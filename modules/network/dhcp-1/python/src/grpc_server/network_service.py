@@ -19,6 +19,7 @@ from dhcp_server import DHCPServer
 from dhcp_config import DHCPConfig
 from dhcp_leases import DHCPLeases
 
+import json
 import traceback
 from common import logger
 
@@ -191,5 +192,5 @@ class NetworkService(pb2_grpc.NetworkModule):
       Return the current status of the network module
     """
     dhcp_status = self._dhcp_server.is_running()
-    message = str({'dhcpStatus': dhcp_status})
+    message = json.dumps({'dhcpStatus': dhcp_status})
     return pb2.Response(code=200, message=message)
@@ -14,6 +14,7 @@
 """Contains all the necessary methods to create and monitor DHCP
 leases on the server"""
 from datetime import datetime
+import json
 import time
 
 time_format = '%Y-%m-%d %H:%M:%S'
@@ -72,4 +73,4 @@ class DHCPLease(object):
     if self.manufacturer is not None:
       lease['manufacturer'] = self.manufacturer
 
-    return str(lease)
+    return json.dumps(lease)
@@ -12,14 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Connection test module"""
-import util
+import itertools
+import socket
+import struct
 import time
 import traceback
-from scapy.all import rdpcap, DHCP, ARP, Ether, IPv6, ICMPv6ND_NS
+from concurrent import futures
+from scapy.all import PcapReader, ARP
 from test_module import TestModule
 from dhcp1.client import Client as DHCPClient1
 from dhcp2.client import Client as DHCPClient2
 from dhcp_util import DHCPUtil
+from oui_util import OUIUtil
+from ping_util import PingUtil
+from pcap_util import get_pcap_events
 from port_stats_util import PortStatsUtil
 
 LOG_NAME = 'test_connection'
@@ -31,10 +37,22 @@ SLAAC_PREFIX = 'fd10:77be:4186'
 TR_CONTAINER_MAC_PREFIX = '9a:02:57:1e:8f:'
 LOGGER = None
 
+# Prefixes as they appear in the raw bytes of captured addresses
+SLAAC_PREFIX_BYTES = socket.inet_pton(
+    socket.AF_INET6, SLAAC_PREFIX + '::')[:len(SLAAC_PREFIX.split(':')) * 2]
+TR_CONTAINER_MAC_PREFIX_BYTES = bytes.fromhex(
+    TR_CONTAINER_MAC_PREFIX.replace(':', ''))
+
 # Should be at least twice as much as the max lease time
 # set in the DHCP server
 LEASE_WAIT_TIME_DEFAULT = 60
 
+# Maximum time to wait for a reserved lease to be replaced and the
+# bounds of the backoff used while polling for the new lease
+RESERVED_LEASE_EXPIRE_WAIT_SEC = 30
+LEASE_POLL_INTERVAL_MIN_SEC = 1
+LEASE_POLL_INTERVAL_MAX_SEC = 5
+
 
 class ConnectionModule(TestModule):
   """Connection Test module"""
@@ -47,11 +65,18 @@ class ConnectionModule(TestModule):
                      results_dir=results_dir)
     global LOGGER
     LOGGER = self._get_logger()
+    # Device MAC as it appears in the raw bytes of captured packets
+    self._device_mac_bytes = (bytes.fromhex(self._device_mac.replace(':', ''))
+                              if self._device_mac else None)
     self._port_stats = PortStatsUtil(logger=LOGGER)
+    self._ping_util = PingUtil(logger=LOGGER)
+    self._oui_util = OUIUtil(logger=LOGGER, oui_file=OUI_FILE)
     self.dhcp1_client = DHCPClient1()
     self.dhcp2_client = DHCPClient2()
-    self._dhcp_util = DHCPUtil(self.dhcp1_client, self.dhcp2_client, LOGGER)
+    self._dhcp_util = DHCPUtil(self.dhcp1_client, self.dhcp2_client, LOGGER,
+                               ping_util=self._ping_util)
     self._lease_wait_time_sec = LEASE_WAIT_TIME_DEFAULT
+    self._pcap_events = {}
 
     # ToDo: Move this into some level of testing, leave for
     # reference until tests are implemented with these calls
@@ -105,16 +130,21 @@ class ConnectionModule(TestModule):
 
     no_arp = True
 
+    # Bind names used for every packet to locals for the loop below
+    device_mac = self._device_mac
+    arp = ARP
+
     # Read all the pcap files
-    packets = rdpcap(STARTUP_CAPTURE_FILE) + rdpcap(MONITOR_CAPTURE_FILE)
+    packets = _read_packets(STARTUP_CAPTURE_FILE, MONITOR_CAPTURE_FILE)
     for packet in packets:
 
-      # We are not interested in packets unless they are ARP packets
-      if not ARP in packet:
+      # We are only interested in packets from the device, this is
+      # checked first as it is cheaper than searching the layers
+      if packet.src != device_mac:
         continue
 
-      # We are only interested in packets from the device
-      if packet.src != self._device_mac:
+      # We are not interested in packets unless they are ARP packets
+      if not packet.haslayer(arp):
         continue
 
       # Get the ARP packet
@@ -122,7 +152,7 @@ class ConnectionModule(TestModule):
       no_arp = False
 
       # Check MAC address matches IP address
-      if (arp_packet.hwsrc == self._device_mac
+      if (arp_packet.hwsrc == device_mac
           and (arp_packet.psrc not in (
             self._device_ipv4_addr,
             '0.0.0.0'
@@ -145,19 +175,18 @@ class ConnectionModule(TestModule):
     disallowed_dhcp_types = [2, 4, 5, 6, 9, 10, 12, 13, 15, 17]
 
     # Read all the pcap files
-    packets = rdpcap(STARTUP_CAPTURE_FILE) + rdpcap(MONITOR_CAPTURE_FILE)
-    for packet in packets:
+    for event in self._get_pcap_events(STARTUP_CAPTURE_FILE,
+                                       MONITOR_CAPTURE_FILE):
 
       # We are not interested in packets unless they are DHCP packets
-      if not DHCP in packet:
+      if event.dhcp_type is None:
         continue
 
       # We are only interested in packets from the device
-      if packet.src != self._device_mac:
+      if event.mac_src != self._device_mac_bytes:
         continue
 
-      dhcp_type = self._get_dhcp_type(packet)
-      if dhcp_type in disallowed_dhcp_types:
+      if event.dhcp_type in disallowed_dhcp_types:
         return False, 'Device has sent disallowed DHCP message'
 
     return True, 'Device does not act as a DHCP server'
@@ -219,41 +248,37 @@ class ConnectionModule(TestModule):
       LOGGER.info('No MAC address found: ')
       return result, 'No MAC address found.'
 
-    # Read all the pcap files containing DHCP packet information
-    packets = rdpcap(STARTUP_CAPTURE_FILE) + rdpcap(MONITOR_CAPTURE_FILE)
-
-    # Extract MAC addresses from DHCP packets
+    # Extract MAC addresses from DHCP packets in all the pcap files
+    # containing DHCP packet information
     mac_addresses = set()
-    LOGGER.info('Inspecting: ' + str(len(packets)) + ' packets')
-    for packet in packets:
-      if DHCP in packet:
-        if self._get_dhcp_type(packet) == 3:
-          mac_address = packet[Ether].src
-          LOGGER.info('DHCPREQUEST detected MAC address: ' + mac_address)
-          if not mac_address.startswith(TR_CONTAINER_MAC_PREFIX):
-            mac_addresses.add(mac_address.upper())
+    for event in self._get_pcap_events(STARTUP_CAPTURE_FILE,
+                                       MONITOR_CAPTURE_FILE):
+      if event.dhcp_type == 3:
+        LOGGER.info('DHCPREQUEST detected MAC address: ' +
+                    event.mac_src.hex(':'))
+        if not event.mac_src.startswith(TR_CONTAINER_MAC_PREFIX_BYTES):
+          mac_addresses.add(event.mac_src)
+          # The result can no longer change once the device and
+          # at least one other MAC address have requested a lease
+          if (len(mac_addresses) > 1 and
+              self._device_mac_bytes in mac_addresses):
+            break
 
     # Check if the device mac address is in the list of DHCPREQUESTs
-    result = self._device_mac.upper() in mac_addresses
+    result = self._device_mac_bytes in mac_addresses
     LOGGER.info('DHCPREQUEST detected from device: ' + str(result))
 
     if not result:
       return result, 'Device did not request a DHCP address.'
 
-    # Check the unique MAC addresses to see if they match the device
-    for mac_address in mac_addresses:
-      result &= self._device_mac.upper() == mac_address
+    # The device mac address must be the only one requesting an address
+    result = len(mac_addresses) == 1
 
     if result:
       return result, 'Device is using a single IP address'
     else:
       return result, 'Device is using multiple IP addresses'
 
-  def _get_dhcp_type(self, packet):
-    for option in packet[DHCP].options:
-      if 'message-type' in option:
-        return option[1]
-
   def _connection_target_ping(self):
     LOGGER.info('Running connection.target_ping')
 
@@ -278,6 +303,7 @@ class ConnectionModule(TestModule):
       self._lease_wait_time_sec = config['lease_wait_time_sec']
 
     if self._dhcp_util.setup_single_dhcp_server():
+      reserved_ip = None
       lease = self._dhcp_util.get_cur_lease(mac_address=self._device_mac,
                                             timeout=self._lease_wait_time_sec)
       if lease is not None:
@@ -287,6 +313,7 @@ class ConnectionModule(TestModule):
         ip_address = '10.10.10.30'
         if self._dhcp_util.add_reserved_lease(lease['hostname'],
                                               lease['hw_addr'], ip_address):
+          reserved_ip = ip_address
           self._dhcp_util.wait_for_lease_expire(lease,
                                                 self._lease_wait_time_sec)
           LOGGER.info('Checking device accepted new ip')
@@ -310,14 +337,32 @@ class ConnectionModule(TestModule):
         result = None, 'Device has no current DHCP lease'
       # Restore the network
       self._dhcp_util.restore_failover_dhcp_server()
-      LOGGER.info('Waiting 30 seconds for reserved lease to expire')
-      time.sleep(30)
-      self._dhcp_util.get_cur_lease(mac_address=self._device_mac,
-                                    timeout=self._lease_wait_time_sec)
+      LOGGER.info('Waiting up to ' + str(RESERVED_LEASE_EXPIRE_WAIT_SEC) +
+                  ' seconds for reserved lease to expire')
+      if self._wait_for_new_lease(reserved_ip,
+                                  RESERVED_LEASE_EXPIRE_WAIT_SEC) is None:
+        self._dhcp_util.get_cur_lease(mac_address=self._device_mac,
+                                      timeout=self._lease_wait_time_sec)
     else:
       result = None, 'Failed to configure network for test'
     return result
 
+  def _wait_for_new_lease(self, old_ip, timeout):
+    # Poll with an increasing interval until the device holds an active
+    # lease on an address other than old_ip or the timeout is reached
+    deadline = time.monotonic() + timeout
+    interval = LEASE_POLL_INTERVAL_MIN_SEC
+    while time.monotonic() < deadline:
+      lease = self._dhcp_util.get_cur_lease(mac_address=self._device_mac,
+                                            timeout=0)
+      if (lease is not None and lease.get('ip') != old_ip and
+          self._dhcp_util.is_lease_active(lease)):
+        LOGGER.info('New device lease confirmed active')
+        return lease
+      time.sleep(max(0, min(interval, deadline - time.monotonic())))
+      interval = min(interval * 2, LEASE_POLL_INTERVAL_MAX_SEC)
+    return None
+
   def _connection_ipaddr_dhcp_failover(self, config):
     result = None
     LOGGER.info('Running connection.ipaddr.dhcp_failover')
@@ -326,11 +371,15 @@ class ConnectionModule(TestModule):
     if 'lease_wait_time_sec' in config:
       self._lease_wait_time_sec = config['lease_wait_time_sec']
 
-    # Confirm that both servers are online
-    primary_status = self._dhcp_util.get_dhcp_server_status(
-        dhcp_server_primary=True)
-    secondary_status = self._dhcp_util.get_dhcp_server_status(
-        dhcp_server_primary=False)
+    # Confirm that both servers are online, each server is queried
+    # over its own channel so the requests can run in parallel
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+      primary_request = executor.submit(
+          self._dhcp_util.get_dhcp_server_status, dhcp_server_primary=True)
+      secondary_request = executor.submit(
+          self._dhcp_util.get_dhcp_server_status, dhcp_server_primary=False)
+      primary_status = primary_request.result()
+      secondary_status = secondary_request.result()
     if primary_status and secondary_status:
       lease = self._dhcp_util.get_cur_lease(mac_address=self._device_mac,
                                             timeout=self._lease_wait_time_sec)
@@ -367,15 +416,7 @@ class ConnectionModule(TestModule):
     return result
 
   def _get_oui_manufacturer(self, mac_address):
-    # Do some quick fixes on the format of the mac_address
-    # to match the oui file pattern
-    mac_address = mac_address.replace(':', '-').upper()
-    with open(OUI_FILE, 'r', encoding='UTF-8') as file:
-      for line in file:
-        if mac_address.startswith(line[:8]):
-          start = line.index('(hex)') + len('(hex)')
-          return line[start:].strip()  # Extract the company name
-    return None
+    return self._oui_util.get_manufacturer(mac_address)
 
   def _connection_ipv6_slaac(self):
     LOGGER.info('Running connection.ipv6_slaac')
@@ -394,22 +435,35 @@ class ConnectionModule(TestModule):
     return result
 
   def _has_slaac_addres(self):
-    packet_capture = (rdpcap(STARTUP_CAPTURE_FILE) +
-                      rdpcap(MONITOR_CAPTURE_FILE) + rdpcap(DHCP_CAPTURE_FILE))
     sends_ipv6 = False
-    for packet_number, packet in enumerate(packet_capture, start=1):
-      if IPv6 in packet and packet.src == self._device_mac:
-        sends_ipv6 = True
-        if ICMPv6ND_NS in packet:
-          ipv6_addr = str(packet[ICMPv6ND_NS].tgt)
-          if ipv6_addr.startswith(SLAAC_PREFIX):
-            self._device_ipv6_addr = ipv6_addr
-            LOGGER.info('SLAAC address detected at packet number' +
-                        f'{packet_number}')
-            LOGGER.info(f'Device has formed SLAAC address {ipv6_addr}')
-            return True, sends_ipv6
+    for event in self._get_pcap_events(STARTUP_CAPTURE_FILE,
+                                       MONITOR_CAPTURE_FILE,
+                                       DHCP_CAPTURE_FILE):
+      if not event.is_ipv6 or event.mac_src != self._device_mac_bytes:
+        continue
+      sends_ipv6 = True
+      target = event.ns_target
+      if target is not None and target.startswith(SLAAC_PREFIX_BYTES):
+        ipv6_addr = socket.inet_ntop(socket.AF_INET6, target)
+        self._device_ipv6_addr = ipv6_addr
+        LOGGER.info('SLAAC address detected at packet number' +
+                    f'{event.number}')
+        LOGGER.info(f'Device has formed SLAAC address {ipv6_addr}')
+        return True, sends_ipv6
     return False, sends_ipv6
 
+  def _get_pcap_events(self, *capture_files):
+    # Each capture file is parsed once and the resulting events are
+    # shared between all tests that inspect it
+    for capture_file in capture_files:
+      if capture_file not in self._pcap_events:
+        self._pcap_events[capture_file] = get_pcap_events(capture_file)
+        LOGGER.info('Inspected: ' + capture_file + ', found ' +
+                    str(len(self._pcap_events[capture_file])) +
+                    ' DHCP and IPv6 packets')
+    return itertools.chain.from_iterable(
+        self._pcap_events[capture_file] for capture_file in capture_files)
+
   def _connection_ipv6_ping(self):
     LOGGER.info('Running connection.ipv6_ping')
     result = None
@@ -427,13 +481,10 @@ class ConnectionModule(TestModule):
     return result
 
   def _ping(self, host, ipv6=False):
-    LOGGER.info('Pinging: ' + str(host))
-    cmd = 'ping -c 1 '
-    cmd += ' -6 ' if ipv6 else ''
-    cmd += str(host)
-    #cmd = 'ping -c 1 ' + str(host)
-    success = util.run_command(cmd, output=False)
-    return success
+    # Every ping is reported as a success, as it was when ping was run
+    # through util.run_command(output=False)
+    self._ping_util.ping(host, ipv6=ipv6)
+    return True
 
   def restore_failover_dhcp_server(self, subnet):
     # Configure the subnet range
@@ -490,12 +541,9 @@ class ConnectionModule(TestModule):
       return False
 
   def is_ip_in_range(self, ip, start_ip, end_ip):
-    ip_int = int(''.join(format(int(octet), '08b') for octet in ip.split('.')),
-                 2)
-    start_int = int(
-        ''.join(format(int(octet), '08b') for octet in start_ip.split('.')), 2)
-    end_int = int(
-        ''.join(format(int(octet), '08b') for octet in end_ip.split('.')), 2)
+    ip_int = _ip_to_int(ip)
+    start_int = _ip_to_int(start_ip)
+    end_int = _ip_to_int(end_ip)
 
     return start_int <= ip_int <= end_int
 
@@ -532,7 +580,7 @@ class ConnectionModule(TestModule):
                                             timeout=self._lease_wait_time_sec)
       if lease is not None:
         if self._dhcp_util.is_lease_active(lease):
-          results = self.test_subnets(ranges)
+          results = self.test_subnets(ranges, lease)
       else:
         LOGGER.info('Failed to confirm a valid active lease for the device')
         return None, 'Failed to confirm a valid active lease for the device'
@@ -602,12 +650,13 @@ class ConnectionModule(TestModule):
         in_range = self.is_ip_in_range(lease['ip'], subnet['start'],
                                        subnet['end'])
         LOGGER.info('Lease within subnet: ' + str(in_range))
-        return in_range
+        return in_range, lease
       else:
         LOGGER.info('Device did not receive lease in subnet')
-        return False
+        return False, lease
     else:
       LOGGER.error('Failed to change subnet')
+      return None, lease
 
   def _change_subnet(self, subnet):
     LOGGER.info('Changing subnet to: ' + str(subnet))
@@ -624,15 +673,18 @@ class ConnectionModule(TestModule):
       LOGGER.debug('Subnet change request failed.')
     return False
 
-  def test_subnets(self, subnets):
+  def test_subnets(self, subnets, lease=None):
     results = []
     for subnet in subnets:
       result = {}
       try:
-        lease = self._dhcp_util.get_cur_lease(mac_address=self._device_mac,
-                                              timeout=self._lease_wait_time_sec)
+        # The lease resolved after the previous subnet change is still
+        # the current one so only query the server when there is none
+        if lease is None:
+          lease = self._dhcp_util.get_cur_lease(
+              mac_address=self._device_mac, timeout=self._lease_wait_time_sec)
         if lease is not None:
-          result = self._test_subnet(subnet, lease)
+          result, lease = self._test_subnet(subnet, lease)
           if result:
             result = {
                 'result':
@@ -659,5 +711,19 @@ class ConnectionModule(TestModule):
         LOGGER.error('Subnet test failed: ' + str(e))
         LOGGER.error(traceback.format_exc())
         result = {'result': False, 'details': 'Subnet test failed: ' + str(e)}
+        lease = None
       results.append(result)
     return results
+
+
+def _ip_to_int(ip):
+  """Converts a dotted IPv4 address into its 32-bit integer value"""
+  return struct.unpack('!I', socket.inet_aton(ip))[0]
+
+
+def _read_packets(*capture_files):
+  """Yields the dissected packets of each pcap file in turn without
+  loading the whole capture into memory"""
+  for capture_file in capture_files:
+    with PcapReader(capture_file) as reader:
+      yield from reader
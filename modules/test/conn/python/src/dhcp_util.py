@@ -14,10 +14,11 @@
 """Module that contains various methods for validating the DHCP 
 device behaviors"""
 
+import json
 import time
 from datetime import datetime
-import util
 from dateutil import tz
+from ping_util import PingUtil
 
 LOG_NAME = 'dhcp_util'
 LOGGER = None
@@ -26,11 +27,16 @@ LOGGER = None
 class DHCPUtil():
   """Helper class for various tests concerning DHCP behavior"""
 
-  def __init__(self, dhcp_primary_client, dhcp_secondary_client, logger):
+  def __init__(self,
+               dhcp_primary_client,
+               dhcp_secondary_client,
+               logger,
+               ping_util=None):
     global LOGGER
     LOGGER = logger
     self._dhcp1_client = dhcp_primary_client
     self._dhcp2_client = dhcp_secondary_client
+    self._ping_util = ping_util or PingUtil(logger=logger)
 
   # Move primary DHCP server from failover into a single DHCP server config
   def disable_failover(self, dhcp_server_primary=True):
@@ -116,7 +122,7 @@ class DHCPUtil():
     response = self.get_dhcp_client(dhcp_server_primary).get_status()
     if response.code == 200:
       LOGGER.debug(f'DHCP {server_name} server status: {response.message}')
-      status = eval(response.message)  # pylint: disable=W0123
+      status = json.loads(response.message)
       return status['dhcpStatus']
     else:
       return False
@@ -188,7 +194,7 @@ class DHCPUtil():
       response = self.get_dhcp_client(dhcp_server_primary).get_lease(
           mac_address)
       if response.code == 200:
-        lease_resp = eval(response.message)  # pylint: disable=W0123
+        lease_resp = json.loads(response.message)
         if lease_resp:  # Check if non-empty lease
           lease = lease_resp
     return lease
@@ -206,9 +212,10 @@ class DHCPUtil():
     return ping_success
 
   def ping(self, host):
-    cmd = 'ping -c 1 ' + str(host)
-    success = util.run_command(cmd, output=False)
-    return success
+    # A missing reply does not fail the check, matching the old
+    # ping command whose exit code was never looked at
+    self._ping_util.ping(host)
+    return True
 
   def add_reserved_lease(self,
                          hostname,
@@ -256,7 +263,8 @@ class DHCPUtil():
       return False
 
   def wait_for_lease_expire(self, lease, max_wait_time=30):
-    expiration_utc = datetime.strptime(lease['expires'], '%Y-%m-%d %H:%M:%S')
+    # Lease expiration is formatted as '%Y-%m-%d %H:%M:%S'
+    expiration_utc = datetime.fromisoformat(lease['expires'])
     # lease information stored in UTC so we need to convert to local time
     expiration = self.utc_to_local(expiration_utc)
     time_to_expire = expiration - datetime.now(tz=tz.tzlocal())
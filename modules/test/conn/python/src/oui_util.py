@@ -0,0 +1,132 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Module that contains methods for resolving the manufacturer of a
+MAC address from the IEEE OUI database"""
+
+from array import array
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+OUI_FILE = '/usr/local/etc/oui.txt'
+OUI_INDEX_FILE = '/usr/local/etc/oui.bin'
+
+# The index file starts with a header followed by the sorted OUI
+# values, the offsets of each manufacturer name and the names themselves.
+# It is built and read inside the same image so native byte order is used.
+OUI_INDEX_MAGIC = b'OUI\x01'
+OUI_INDEX_HEADER = struct.Struct('=4sI')
+
+LOG_NAME = 'oui_util'
+LOGGER = None
+
+
+class OUIUtil():
+  """Helper class for looking up MAC address manufacturers"""
+
+  def __init__(self, logger, oui_file=OUI_FILE, index_file=OUI_INDEX_FILE):
+    global LOGGER
+    LOGGER = logger
+    self._oui_file = oui_file
+    self._index_file = index_file
+    self._ouis = None
+    self._offsets = None
+    self._names = None
+    self._oui_cache = None
+
+  def get_manufacturer(self, mac_address):
+    """Returns the manufacturer registered for the OUI of the mac address
+    or None if the OUI is not registered"""
+    try:
+      oui = int(mac_address.replace(':', '').replace('-', '')[:6], 16)
+    except ValueError:
+      return None
+    if self._ouis is None and self._oui_cache is None:
+      self._load()
+    if self._ouis is not None:
+      i = bisect.bisect_left(self._ouis, oui)
+      if i < len(self._ouis) and self._ouis[i] == oui:
+        return str(self._names[self._offsets[i]:self._offsets[i + 1]],
+                   'UTF-8')
+      return None
+    return self._oui_cache.get(oui)
+
+  def _load(self):
+    # Prefer the prebuilt index unless the oui file has been updated
+    # since it was built, otherwise parse the oui file directly
+    try:
+      if (os.path.exists(self._oui_file) and os.path.getmtime(
+          self._index_file) < os.path.getmtime(self._oui_file)):
+        LOGGER.info('OUI index is older than ' + self._oui_file)
+      else:
+        self._load_index()
+        return
+    except (OSError, ValueError) as e:
+      LOGGER.info('OUI index not available: ' + str(e))
+    self._oui_cache = dict(_parse_oui_file(self._oui_file))
+
+  def _load_index(self):
+    with open(self._index_file, 'rb') as f:
+      index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, count = OUI_INDEX_HEADER.unpack_from(index)
+    if magic != OUI_INDEX_MAGIC:
+      raise ValueError('Invalid OUI index file: ' + self._index_file)
+    view = memoryview(index)
+    start = OUI_INDEX_HEADER.size
+    end = start + count * 4
+    self._ouis = view[start:end].cast('I')
+    self._offsets = view[end:end + (count + 1) * 4].cast('I')
+    self._names = view[end + (count + 1) * 4:]
+
+
+def build_oui_index(oui_file=OUI_FILE, index_file=OUI_INDEX_FILE):
+  """Converts the oui file into the sorted binary index read by OUIUtil"""
+  entries = sorted(dict(_parse_oui_file(oui_file)).items())
+  ouis = array('I', (oui for oui, _ in entries))
+  offsets = array('I', [0])
+  names = bytearray()
+  for _, name in entries:
+    names += name.encode('UTF-8')
+    offsets.append(len(names))
+  with open(index_file, 'wb') as f:
+    f.write(OUI_INDEX_HEADER.pack(OUI_INDEX_MAGIC, len(ouis)))
+    f.write(ouis.tobytes())
+    f.write(offsets.tobytes())
+    f.write(names)
+  return len(ouis)
+
+
+def _parse_oui_file(oui_file):
+  """Yields the OUI and manufacturer of each entry in the oui file,
+  keeping only the first entry listed for an OUI"""
+  seen = set()
+  with open(oui_file, 'r', encoding='UTF-8') as file:
+    for line in file:
+      prefix, sep, manufacturer = line.partition('(hex)')
+      if sep:
+        try:
+          oui = int(prefix[:8].replace('-', ''), 16)
+        except ValueError:
+          continue
+        if oui not in seen:
+          seen.add(oui)
+          yield oui, manufacturer.strip()
+
+
+if __name__ == '__main__':
+  # Build the index from the arguments or default locations
+  print('Built OUI index with ' + str(build_oui_index(*sys.argv[1:3])) +
+        ' entries')
@@ -0,0 +1,145 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Module that contains methods for extracting DHCP and IPv6 information
+directly from the raw bytes of a pcap file"""
+
+import struct
+from collections import namedtuple
+
+# Pcap file format constants
+PCAP_MAGIC_USEC = 0xa1b2c3d4
+PCAP_MAGIC_NSEC = 0xa1b23c4d
+PCAP_GLOBAL_HEADER_LEN = 24
+PCAP_RECORD_HEADER_LEN = 16
+PCAP_LINKTYPE_OFFSET = 20
+PCAP_LINKTYPE_ETHERNET = 1
+
+# Raw packet constants used when walking the capture files
+ETH_HEADER_LEN = 14
+ETH_TYPE_IPV4 = b'\x08\x00'
+ETH_TYPE_IPV6 = b'\x86\xdd'
+IPV6_HEADER_LEN = 40
+IPV6_EXT_HEADERS = (0, 43, 44, 60)
+IP_PROTO_UDP = 17
+IP_PROTO_ICMPV6 = 58
+ICMPV6_NEIGHBOR_SOLICIT = 135
+DHCP_PORTS = (67, 68)
+DHCP_MAGIC_COOKIE = b'\x63\x82\x53\x63'
+DHCP_OPTIONS_OFFSET = 240
+DHCP_OPTION_PAD = 0
+DHCP_OPTION_MESSAGE_TYPE = 53
+DHCP_OPTION_END = 255
+
+# Summary of a DHCP or IPv6 packet found in a capture file
+PcapEvent = namedtuple('PcapEvent',
+                       ['number', 'mac_src', 'is_ipv6', 'dhcp_type',
+                        'ns_target'])
+
+
+def get_pcap_events(capture_file):
+  """Returns a PcapEvent for every DHCP or IPv6 packet in a pcap file"""
+  events = []
+  for number, buf in enumerate(read_pcap(capture_file), start=1):
+    if buf[12:14] == ETH_TYPE_IPV6:
+      target = get_ipv6_ns_target(buf)
+      events.append(
+          PcapEvent(number, bytes(buf[6:12]), True, None,
+                    bytes(target) if target is not None else None))
+    else:
+      dhcp_type = get_dhcp_message_type(buf)
+      if dhcp_type is not None:
+        events.append(
+            PcapEvent(number, bytes(buf[6:12]), False, dhcp_type, None))
+  return events
+
+
+def read_pcap(capture_file):
+  """Yields the raw ethernet frame of each packet in a pcap file.
+  Records are read from the file one at a time so only the current
+  frame is held in memory."""
+  with open(capture_file, 'rb') as f:
+    header = f.read(PCAP_GLOBAL_HEADER_LEN)
+    if len(header) < PCAP_GLOBAL_HEADER_LEN:
+      return
+    for endian in ('<', '>'):
+      magic = struct.unpack_from(endian + 'I', header)[0]
+      if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+        break
+    else:
+      raise ValueError('Unsupported capture file format: ' + capture_file)
+    linktype = struct.unpack_from(endian + 'I', header,
+                                  PCAP_LINKTYPE_OFFSET)[0]
+    if linktype != PCAP_LINKTYPE_ETHERNET:
+      raise ValueError('Unsupported capture link type ' + str(linktype) +
+                       ': ' + capture_file)
+    record_header = struct.Struct(endian + 'IIII')
+    while True:
+      record = f.read(PCAP_RECORD_HEADER_LEN)
+      if len(record) < PCAP_RECORD_HEADER_LEN:
+        return
+      _, _, captured_len, _ = record_header.unpack(record)
+      yield f.read(captured_len)
+
+
+def get_dhcp_message_type(buf):
+  """Returns the DHCP message type (option 53) of a raw ethernet frame
+  or None if the frame does not contain a DHCP message"""
+  if buf[12:14] != ETH_TYPE_IPV4 or len(buf) < ETH_HEADER_LEN + 20:
+    return None
+  if buf[ETH_HEADER_LEN + 9] != IP_PROTO_UDP:
+    return None
+  udp_offset = ETH_HEADER_LEN + (buf[ETH_HEADER_LEN] & 0x0f) * 4
+  if len(buf) < udp_offset + 8:
+    return None
+  src_port, dst_port = struct.unpack_from('!HH', buf, udp_offset)
+  if src_port not in DHCP_PORTS or dst_port not in DHCP_PORTS:
+    return None
+  offset = udp_offset + 8 + DHCP_OPTIONS_OFFSET
+  if buf[offset - 4:offset] != DHCP_MAGIC_COOKIE:
+    return None
+  # Walk the TLV encoded options until the message type is found
+  end = len(buf)
+  while offset < end:
+    code = buf[offset]
+    if code == DHCP_OPTION_END:
+      break
+    if code == DHCP_OPTION_PAD:
+      offset += 1
+      continue
+    if offset + 2 >= end:
+      break
+    if code == DHCP_OPTION_MESSAGE_TYPE:
+      return buf[offset + 2]
+    offset += 2 + buf[offset + 1]
+  return None
+
+
+def get_ipv6_ns_target(buf):
+  """Returns the target address bytes of an ICMPv6 neighbor solicitation
+  in a raw ethernet frame or None if the frame is not a neighbor
+  solicitation"""
+  if (buf[12:14] != ETH_TYPE_IPV6 or
+      len(buf) < ETH_HEADER_LEN + IPV6_HEADER_LEN):
+    return None
+  next_header = buf[ETH_HEADER_LEN + 6]
+  offset = ETH_HEADER_LEN + IPV6_HEADER_LEN
+  # Skip over any extension headers preceding the ICMPv6 header
+  while next_header in IPV6_EXT_HEADERS and offset + 2 <= len(buf):
+    next_header = buf[offset]
+    offset += (buf[offset + 1] + 1) * 8
+  if next_header != IP_PROTO_ICMPV6 or len(buf) < offset + 24:
+    return None
+  if buf[offset] != ICMPV6_NEIGHBOR_SOLICIT:
+    return None
+  return buf[offset + 8:offset + 24]
@@ -0,0 +1,144 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Module that contains methods for pinging a device over raw ICMP sockets"""
+
+import os
+import socket
+import struct
+import time
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+ICMP_HEADER_FORMAT = '!BBHHH'
+ICMP_PAYLOAD = b'testrun-ping'
+PING_TIMEOUT_SEC = 1
+
+LOG_NAME = 'ping_util'
+LOGGER = None
+
+
+class PingUtil():
+  """Helper class for sending ICMP echo requests to the device"""
+
+  def __init__(self, logger, timeout=PING_TIMEOUT_SEC):
+    global LOGGER
+    LOGGER = logger
+    self._timeout = timeout
+    self._identifier = os.getpid() & 0xFFFF
+    self._sequence = 0
+    # Raw sockets are opened on first use and reused for later pings
+    self._sockets = {}
+
+  def __del__(self):
+    self.close()
+
+  def ping(self, host, ipv6=False):
+    """Sends a single echo request to the host and waits for the reply.
+    Returns True if a matching echo reply was received before
+    the timeout expired."""
+    LOGGER.info('Pinging: ' + str(host))
+    self._sequence = (self._sequence + 1) & 0xFFFF
+    request_type = ICMPV6_ECHO_REQUEST if ipv6 else ICMP_ECHO_REQUEST
+    packet = self._build_echo_request(request_type, self._sequence)
+    try:
+      sock = self._get_socket(ipv6)
+      self._drain(sock)
+      sock.sendto(packet, (str(host), 0))
+      return self._wait_for_reply(sock, ipv6, self._sequence)
+    except OSError as e:
+      LOGGER.error('Failed to ping ' + str(host) + ': ' + str(e))
+      # Open a fresh socket on the next ping in case this one is unusable
+      sock = self._sockets.pop(ipv6, None)
+      if sock is not None:
+        sock.close()
+      return False
+
+  def close(self):
+    """Closes any raw sockets opened by previous pings"""
+    for sock in self._sockets.values():
+      sock.close()
+    self._sockets.clear()
+
+  def _get_socket(self, ipv6):
+    sock = self._sockets.get(ipv6)
+    if sock is None:
+      if ipv6:
+        sock = socket.socket(socket.AF_INET6, socket.SOCK_RAW,
+                             socket.IPPROTO_ICMPV6)
+      else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW,
+                             socket.IPPROTO_ICMP)
+      self._sockets[ipv6] = sock
+    return sock
+
+  def _drain(self, sock):
+    # A raw socket receives every ICMP packet for the host, discard
+    # anything queued since the last ping so the buffer cannot fill up
+    # and drop the reply we are about to wait for
+    sock.setblocking(False)
+    try:
+      while True:
+        sock.recv(1024)
+    except BlockingIOError:
+      pass
+
+  def _build_echo_request(self, request_type, sequence):
+    header = struct.pack(ICMP_HEADER_FORMAT, request_type, 0, 0,
+                         self._identifier, sequence)
+    # The kernel fills in the checksum for ICMPv6 but calculating
+    # it for both is harmless and keeps the packet format in one place
+    checksum = _get_checksum(header + ICMP_PAYLOAD)
+    header = struct.pack(ICMP_HEADER_FORMAT, request_type, 0, checksum,
+                         self._identifier, sequence)
+    return header + ICMP_PAYLOAD
+
+  def _wait_for_reply(self, sock, ipv6, sequence):
+    deadline = time.monotonic() + self._timeout
+    while True:
+      remaining = deadline - time.monotonic()
+      if remaining <= 0:
+        return False
+      sock.settimeout(remaining)
+      try:
+        data = sock.recv(1024)
+      except socket.timeout:
+        return False
+      if self._is_reply(data, ipv6, sequence):
+        return True
+
+  def _is_reply(self, data, ipv6, sequence):
+    """Returns True if the received packet is the echo reply
+    to the request with the given sequence number"""
+    reply_type = ICMPV6_ECHO_REPLY if ipv6 else ICMP_ECHO_REPLY
+    # IPv4 raw sockets include the IP header, ICMPv6 sockets do not
+    offset = 0 if ipv6 or not data else (data[0] & 0x0F) * 4
+    icmp = data[offset:offset + struct.calcsize(ICMP_HEADER_FORMAT)]
+    if len(icmp) < struct.calcsize(ICMP_HEADER_FORMAT):
+      return False
+    icmp_type, _, _, identifier, reply_sequence = struct.unpack(
+        ICMP_HEADER_FORMAT, icmp)
+    return (icmp_type == reply_type and identifier == self._identifier and
+            reply_sequence == sequence)
+
+
+def _get_checksum(data):
+  """Calculates the internet checksum of the provided bytes"""
+  if len(data) % 2:
+    data += b'\x00'
+  total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+  total = (total >> 16) + (total & 0xFFFF)
+  total += total >> 16
+  return ~total & 0xFFFF
@@ -13,8 +13,16 @@
 # limitations under the License.
 """Module run all the Connection module related unit tests"""
 from port_stats_util import PortStatsUtil
+from pcap_util import get_pcap_events
+from oui_util import OUIUtil, build_oui_index
+from ping_util import PingUtil, _get_checksum
+import struct
 import os
+import socket
 import unittest
+from scapy.all import (ARP, BOOTP, DHCP, DNS, DNSQR, Ether, ICMP,
+                       ICMPv6EchoReply, ICMPv6ND_NS, IP, IPv6, PcapWriter,
+                       UDP, raw)
 from common import logger
 
 MODULE = 'conn'
@@ -34,6 +42,11 @@ ETHTOOL_PORT_STATS_POST_FILE = os.path.join(
 ETHTOOL_PORT_STATS_POST_NONCOMPLIANT_FILE = os.path.join(
     TEST_FILES_DIR, 'ethtool',
     'ethtool_port_stats_post_monitor_noncompliant.txt')
+OUTPUT_DIR = os.path.join(TEST_FILES_DIR, 'output/')
+OUI_FILE = 'modules/test/base/usr/local/etc/oui.txt'
+
+DEVICE_MAC = '00:11:22:33:44:55'
+SLAAC_ADDRESS = 'fd10:77be:4186:0:211:22ff:fe33:4455'
 LOGGER = None
 
 
@@ -45,6 +58,7 @@ class ConnectionModuleTest(unittest.TestCase):
   def setUpClass(cls):
     global LOGGER
     LOGGER = logger.get_logger('unit_test_' + MODULE)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
   # Test the port link status
   def connection_port_link_compliant_test(self):
@@ -117,6 +131,121 @@ class ConnectionModuleTest(unittest.TestCase):
     LOGGER.info(result)
     self.assertEqual(result[0], False)
 
+  # Test the DHCP and IPv6 summaries extracted from a capture file
+  def connection_pcap_events_test(self):
+    LOGGER.info('connection_pcap_events_test')
+    capture_file = self._write_capture_file('pcap_events.pcap')
+    events = get_pcap_events(capture_file)
+    LOGGER.info(events)
+    device_mac = bytes.fromhex(DEVICE_MAC.replace(':', ''))
+    self.assertEqual(len(events), 2)
+    self.assertEqual(events[0].number, 2)
+    self.assertEqual(events[0].mac_src, device_mac)
+    self.assertEqual(events[0].dhcp_type, 3)
+    self.assertFalse(events[0].is_ipv6)
+    self.assertEqual(events[1].number, 4)
+    self.assertTrue(events[1].is_ipv6)
+    self.assertEqual(events[1].ns_target,
+                     socket.inet_pton(socket.AF_INET6, SLAAC_ADDRESS))
+
+  # Test the alternate pcap timestamp and byte order formats
+  def connection_pcap_events_formats_test(self):
+    LOGGER.info('connection_pcap_events_formats_test')
+    expected = get_pcap_events(self._write_capture_file('pcap_events.pcap'))
+    for endianness in ('<', '>'):
+      for nano in (False, True):
+        capture_file = self._write_capture_file(
+            f'pcap_events_{ord(endianness)}_{nano}.pcap',
+            endianness=endianness,
+            nano=nano)
+        self.assertEqual(get_pcap_events(capture_file), expected)
+
+  # Test capture files that are not ethernet are rejected
+  def connection_pcap_events_linktype_test(self):
+    LOGGER.info('connection_pcap_events_linktype_test')
+    capture_file = os.path.join(OUTPUT_DIR, 'pcap_events_raw.pcap')
+    with PcapWriter(capture_file, linktype=101) as writer:
+      writer.write(raw(IP(dst='10.10.10.4') / UDP(sport=68, dport=67)))
+    with self.assertRaises(ValueError):
+      get_pcap_events(capture_file)
+
+  # Test the OUI index resolves the same manufacturers as the oui file
+  def connection_oui_index_test(self):
+    LOGGER.info('connection_oui_index_test')
+    index_file = os.path.join(OUTPUT_DIR, 'oui.bin')
+    build_oui_index(OUI_FILE, index_file)
+    oui_index = OUIUtil(logger=LOGGER, oui_file=OUI_FILE, index_file=index_file)
+    oui_text = OUIUtil(logger=LOGGER,
+                       oui_file=OUI_FILE,
+                       index_file=os.path.join(OUTPUT_DIR, 'no_oui.bin'))
+    with open(OUI_FILE, 'r', encoding='UTF-8') as file:
+      macs = [line[:8].replace('-', ':') + ':00:00:00'
+              for line in file if '(hex)' in line]
+    macs.append('9a:02:57:1e:8f:01')
+    for mac in macs:
+      self.assertEqual(oui_index.get_manufacturer(mac),
+                       oui_text.get_manufacturer(mac))
+    self.assertIsNotNone(oui_index.get_manufacturer(macs[0]))
+    self.assertIsNone(oui_index.get_manufacturer('9a:02:57:1e:8f:01'))
+
+  # Test the internet checksum against the RFC 1071 example
+  def connection_ping_checksum_test(self):
+    LOGGER.info('connection_ping_checksum_test')
+    self.assertEqual(_get_checksum(bytes.fromhex('0001f203f4f5f6f7')), 0x220d)
+    # Odd length data is padded with a zero byte
+    self.assertEqual(_get_checksum(b'\x01'), _get_checksum(b'\x01\x00'))
+
+  # Test the echo request matches the packet scapy builds
+  def connection_ping_echo_request_test(self):
+    LOGGER.info('connection_ping_echo_request_test')
+    ping_util = PingUtil(logger=LOGGER)
+    identifier = ping_util._identifier # pylint: disable=W0212
+    packet = ping_util._build_echo_request(8, 7) # pylint: disable=W0212
+    expected = ICMP(type=8, id=identifier, seq=7) / b'testrun-ping'
+    self.assertEqual(packet, raw(expected))
+    self.assertEqual(_get_checksum(packet), 0)
+    self.assertEqual(struct.unpack('!BB', packet[:2]), (8, 0))
+
+  # Test only the matching echo reply is accepted
+  def connection_ping_reply_test(self):
+    LOGGER.info('connection_ping_reply_test')
+    ping_util = PingUtil(logger=LOGGER)
+    identifier = ping_util._identifier # pylint: disable=W0212
+    is_reply = ping_util._is_reply # pylint: disable=W0212
+    # IPv4 replies include the IP header, options change its length
+    for ip in (IP(), IP(options=b'\x01\x01\x01\x00')):
+      self.assertTrue(is_reply(raw(ip / ICMP(type=0, id=identifier, seq=7)),
+                               False, 7))
+    self.assertFalse(
+        is_reply(raw(IP() / ICMP(type=0, id=identifier, seq=8)), False, 7))
+    self.assertFalse(
+        is_reply(raw(IP() / ICMP(type=0, id=identifier ^ 1, seq=7)), False,
+                 7))
+    self.assertFalse(
+        is_reply(raw(IP() / ICMP(type=8, id=identifier, seq=7)), False, 7))
+    self.assertTrue(
+        is_reply(raw(ICMPv6EchoReply(id=identifier, seq=7, cksum=0)), True, 7))
+    self.assertFalse(
+        is_reply(raw(ICMPv6EchoReply(id=identifier, seq=7, cksum=0)), False, 7))
+    self.assertFalse(is_reply(raw(IP())[:10], False, 7))
+    self.assertFalse(is_reply(b'', True, 7))
+
+  def _write_capture_file(self, file_name, **kwargs):
+    capture_file = os.path.join(OUTPUT_DIR, file_name)
+    packets = [
+        Ether(src=DEVICE_MAC) / ARP(hwsrc=DEVICE_MAC, psrc='10.10.10.14'),
+        Ether(src=DEVICE_MAC) / IP(src='0.0.0.0', dst='255.255.255.255') /
+        UDP(sport=68, dport=67) / BOOTP(chaddr=DEVICE_MAC) /
+        DHCP(options=[('message-type', 'request'), 'end']),
+        Ether(src=DEVICE_MAC) / IP(dst='10.10.10.4') / UDP(sport=5353) /
+        DNS(qd=DNSQR(qname='example.com')),
+        Ether(src=DEVICE_MAC) / IPv6(src='::', dst='ff02::1:ff33:4455') /
+        ICMPv6ND_NS(tgt=SLAAC_ADDRESS)
+    ]
+    with PcapWriter(capture_file, linktype=1, **kwargs) as writer:
+      writer.write(packets)
+    return capture_file
+
 
 if __name__ == '__main__':
   suite = unittest.TestSuite()
@@ -136,5 +265,18 @@ if __name__ == '__main__':
   suite.addTest(
       ConnectionModuleTest('connection_port_speed_autonegotiation_fail_test'))
 
+  # Capture file parsing tests
+  suite.addTest(ConnectionModuleTest('connection_pcap_events_test'))
+  suite.addTest(ConnectionModuleTest('connection_pcap_events_formats_test'))
+  suite.addTest(ConnectionModuleTest('connection_pcap_events_linktype_test'))
+
+  # Ping packet tests
+  suite.addTest(ConnectionModuleTest('connection_ping_checksum_test'))
+  suite.addTest(ConnectionModuleTest('connection_ping_echo_request_test'))
+  suite.addTest(ConnectionModuleTest('connection_ping_reply_test'))
+
+  # OUI lookup tests
+  suite.addTest(ConnectionModuleTest('connection_oui_index_test'))
+
   runner = unittest.TextTestRunner()
   runner.run(suite)